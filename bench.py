@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+╔═══════════════════════════════════════════════════════════════╗
+║         TELEGRAM AUTO LEAVE - BENCHMARKS                      ║
+║  Measures main.py against a fake Telegram client (no network) ║
+╚═══════════════════════════════════════════════════════════════╝
+
+Usage:
+    python bench.py                         # Default sizes, writes bench_results.json
+    python bench.py --dialogs 20000 --leave 500 --latency 0.05
+    python bench.py --flood-every 50 --flood-seconds 1
+    python bench.py --page-latency 0.3 --changed 150
+    python bench.py --compare old_results.json
+
+Measures:
+    fetch_dialogs (full + incremental), DialogStore memory, parse_range,
+    search, filter, show_dialogs rendering + sorted views, _execute_leave throughput
+"""
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORTS
+# ═══════════════════════════════════════════════════════════════
+from telethon.tl.types import Channel, Chat, ChatPhotoEmpty   # Real entity types
+from telethon.errors import FloodWaitError                    # Injected flood errors
+from datetime import datetime, timezone
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+import main
+
+
+# ═══════════════════════════════════════════════════════════════
+# FAKE TELEGRAM CLIENT
+# ═══════════════════════════════════════════════════════════════
+class FakeNotify:
+    """Stand-in for PeerNotifySettings."""
+    def __init__(self, mute_until=None):
+        self.mute_until = mute_until
+
+
+class FakeRawDialog:
+    """Stand-in for the raw tl Dialog (only notify_settings is used)."""
+    def __init__(self, notify_settings):
+        self.notify_settings = notify_settings
+
+
+class FakeDialog:
+    """Stand-in for telethon's custom Dialog with the fields main.py reads."""
+    def __init__(self, entity, title, date, pinned=False, archived=False,
+                 unread_count=0, muted=False):
+        self.entity = entity
+        self.title = title
+        self.date = date
+        self.pinned = pinned
+        self.archived = archived
+        self.unread_count = unread_count
+        mute_until = datetime(2038, 1, 1, tzinfo=timezone.utc) if muted else None
+        self.dialog = FakeRawDialog(FakeNotify(mute_until))
+
+
+def make_dialogs(count, channel_ratio=0.7, seed=1):
+    """
+    Build `count` synthetic dialogs, newest first (like iter_dialogs).
+
+    Mix of channels, supergroups and basic groups, with random
+    titles/usernames, unread counts and archived/muted/admin states.
+    """
+    rng = random.Random(seed)
+    words = ['crypto', 'news', 'daily', 'family', 'airdrop', 'tech', 'music',
+             'deals', 'python', 'memes', 'signals', 'jobs', 'movies', 'chat',
+             'official', 'group', 'club', 'world', 'tips', 'updates']
+    now = time.time()
+    dialogs = []
+
+    for i in range(count):
+        title = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 4))).title()
+        date = datetime.fromtimestamp(now - i * 600, timezone.utc)
+        admin = rng.random() < 0.05
+
+        if rng.random() < channel_ratio:
+            entity = Channel(
+                id=1_000_000 + i, title=title, photo=ChatPhotoEmpty(), date=date,
+                access_hash=rng.getrandbits(63),
+                megagroup=rng.random() < 0.5,
+                username=f"{title.replace(' ', '_').lower()}_{i}" if rng.random() < 0.4 else None,
+                creator=admin and rng.random() < 0.3)
+        else:
+            entity = Chat(
+                id=2_000_000 + i, title=title, photo=ChatPhotoEmpty(),
+                participants_count=rng.randint(2, 200), date=date, version=1,
+                creator=admin and rng.random() < 0.3)
+
+        dialogs.append(FakeDialog(
+            entity, title, date,
+            pinned=i < 3,
+            archived=rng.random() < 0.1,
+            unread_count=rng.choice([0, 0, 0, rng.randint(1, 5000)]),
+            muted=rng.random() < 0.3))
+
+    return dialogs
+
+
+class FakeClient:
+    """
+    Local stand-in for TelegramClient.
+
+    - iter_dialogs(): yields synthetic dialogs, `page_latency` per page of
+      100 (one GetDialogsRequest each, counted in `pages`); pages are only
+      asked for when the caller gets that far, like Telethon's iterator
+    - client(request): answers LeaveChannelRequest / DeleteChatUserRequest
+      after `latency` seconds; every `flood_every`-th request raises
+      FloodWaitError(seconds=flood_seconds)
+    """
+
+    PAGE = 100      # Telegram returns dialogs in pages of 100
+
+    def __init__(self, dialogs, latency=0.0, flood_every=0, flood_seconds=1,
+                 page_latency=None):
+        self.dialogs = dialogs
+        self.latency = latency
+        self.page_latency = latency if page_latency is None else page_latency
+        self.flood_every = flood_every
+        self.flood_seconds = flood_seconds
+        self.requests = 0
+        self.floods = 0
+        self.pages = 0          # Dialog pages served (GetDialogsRequest)
+
+    async def connect(self):
+        await asyncio.sleep(self.latency)
+
+    async def start(self, phone=None):
+        await self.connect()
+
+    async def is_user_authorized(self):
+        return True
+
+    async def get_me(self):
+        class Me:
+            first_name = 'Bench'
+            username = 'bench'
+        return Me()
+
+    async def disconnect(self):
+        pass
+
+    async def iter_dialogs(self):
+        for i, dialog in enumerate(self.dialogs):
+            if i % self.PAGE == 0:
+                self.pages += 1
+                if self.page_latency:
+                    await asyncio.sleep(self.page_latency)
+            yield dialog
+
+    async def __call__(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.flood_every and self.requests % self.flood_every == 0:
+            self.floods += 1
+            raise FloodWaitError(request, capture=self.flood_seconds)
+        return True
+
+
+# ═══════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════
+def timed(fn, repeat):
+    """Best and mean seconds of `repeat` calls of fn()."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'best_s': min(times), 'mean_s': sum(times) / len(times), 'repeat': repeat}
+
+
+def make_app(client):
+    """App wired to a fake client (quiet: output goes to a buffer)."""
+    return main.App(0, 'bench', '+0', client=client)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BENCHMARKS
+# ═══════════════════════════════════════════════════════════════
+def bump(dialogs, count, seed=2):
+    """
+    The same list after `count` chats got a new message: those move to
+    the top (below the pinned ones) with a newer date, like Telegram sorts.
+    """
+    rng = random.Random(seed)
+    pinned = [d for d in dialogs if d.pinned]
+    rest = [d for d in dialogs if not d.pinned]
+    now = datetime.now(timezone.utc)
+
+    moved = []
+    for i in sorted(rng.sample(range(len(rest)), min(count, len(rest))), reverse=True):
+        d = copy.copy(rest.pop(i))
+        d.date = now
+        moved.append(d)
+    return pinned + moved + rest
+
+
+def bench_fetch(args, dialogs):
+    """
+    Full fetch (empty cache) and incremental fetch (warm cache, a few
+    chats with new messages), each with `args.page_latency` per page.
+
+    Wall time alone hides what the incremental fetch saves, so the
+    dialog pages asked from Telegram are reported too.
+    """
+    client = FakeClient(dialogs, page_latency=args.page_latency)
+    app = make_app(client)
+
+    start = time.perf_counter()
+    asyncio.run(app.fetch_dialogs(verbose=False))
+    full = time.perf_counter() - start
+    full_pages = client.pages
+
+    # Warm cache, `args.changed` chats moved up → stops at the first unchanged one
+    client = FakeClient(bump(dialogs, args.changed), page_latency=args.page_latency)
+    app.client = client
+    start = time.perf_counter()
+    asyncio.run(app.fetch_dialogs(verbose=False))
+    incremental = time.perf_counter() - start
+
+    app.cache.close()
+    return {'dialogs': len(app.dialogs), 'changed': args.changed,
+            'full_s': full, 'full_pages': full_pages,
+            'incremental_s': incremental, 'incremental_pages': client.pages,
+            'incremental_scanned': app.scanned}, app
+
+
+def bench_store(args, app):
+    """Memory a DialogStore of all fetched dialogs holds (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        store = main.DialogStore(app.dialogs)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return {'dialogs': len(store), 'total_bytes': size,
+            'per_dialog_bytes': round(size / max(1, len(store)), 1)}
+
+
+def bench_parse_range(args, total):
+    inputs = {
+        'all': 'all',
+        'many_ranges': ','.join(f"{i}-{i + 5}" for i in range(1, total, 10)),
+        'huge_typo': '1-1000000',
+    }
+    return {name: timed(lambda s=s: main.parse_range(s, total), args.repeat)
+            for name, s in inputs.items()}
+
+
+def bench_search(args, app):
+    build = timed(lambda: main.SearchIndex(app.dialogs), max(1, args.repeat // 10))
+    terms = ['news', 'crypto daily', 'pyhton', 'zz', 'official updates']
+    queries = {t: timed(lambda t=t: app.index.search(t), args.repeat) for t in terms}
+    return {'build': build, 'queries': queries}
+
+
+def bench_filter(args, app):
+    expr = 'type:channel and age>2d and not (is:admin or title~news) and unread<1000'
+    compile_t = timed(lambda: main.compile_filter(expr), args.repeat)
+    predicate = main.compile_filter(expr)
+    run_t = timed(lambda: [d for d in app.dialogs if predicate(d)], max(1, args.repeat // 10))
+    matching_t = timed(lambda: app.dialogs.matching(predicate), max(1, args.repeat // 10))
+    mask_t = timed(lambda: app.dialogs.mask(**predicate.columns), args.repeat)
+    return {'expr': expr, 'compile': compile_t, 'run_all': run_t,
+            'matching': matching_t, 'mask': mask_t}
+
+
+def bench_render(args, app):
+    """show_dialogs for the first page, output into a buffer."""
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            app.show_dialogs(1, page_size=100)
+
+    def sort_cold():
+        app.dialogs.views.clear()
+        app.dialogs.view('unread', 'type')
+
+    return {'page': timed(render, args.repeat),
+            'sort_cold': timed(sort_cold, args.repeat),
+            'sort_cached': timed(lambda: app.dialogs.view('unread', 'type'), args.repeat)}
+
+
+def bench_leave(args, dialogs):
+    """End-to-end _execute_leave over `args.leave` dialogs."""
+    client = FakeClient(dialogs, latency=args.latency,
+                        flood_every=args.flood_every, flood_seconds=args.flood_seconds)
+    app = make_app(client)
+    asyncio.run(app.fetch_dialogs(verbose=False))
+
+    # Pacing under test: start rate and ceiling
+    app.scheduler = main.LeaveScheduler(rate=args.rate_start, rate_max=args.rate_max)
+    app.workers = args.workers
+
+    plan = list(app.dialogs)[:args.leave]
+    start = time.perf_counter()
+    asyncio.run(app._execute_leave(plan))
+    elapsed = time.perf_counter() - start
+
+    app.cache.close()
+    return {
+        'items': len(plan),
+        'workers': args.workers,
+        'seconds': elapsed,
+        'items_per_s': len(plan) / elapsed if elapsed else 0.0,
+        'requests': client.requests,
+        'floods': client.floods,
+        'success': app.stats['success'],
+        'failed': app.stats['failed'],
+    }
+
+
+def compare(results, old_path):
+    """Print how each timing (and memory size) changed vs an older results file."""
+    with open(old_path, 'r') as f:
+        old = json.load(f)['results']
+
+    def walk(new, prev, path):
+        for key, value in new.items():
+            if key not in prev:
+                continue
+            if isinstance(value, dict):
+                walk(value, prev[key], f"{path}{key}.")
+            elif key.endswith(('_s', '_bytes')) and isinstance(value, (int, float)) and prev[key]:
+                ratio = value / prev[key]
+                mark = '🔴' if ratio > 1.1 else '🟢' if ratio < 0.9 else '⚪'
+                print(f"  {mark} {path}{key}: {prev[key]:.6f} → {value:.6f} ({ratio:.2f}x)")
+
+    print(f"\nCompared with {old_path}:")
+    walk(results, old, '')
+
+
+# ═══════════════════════════════════════════════════════════════
+# ENTRY POINT
+# ═══════════════════════════════════════════════════════════════
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for main.py (fake Telegram client)")
+    parser.add_argument('--dialogs', type=int, default=5000, help="synthetic dialogs (default 5000)")
+    parser.add_argument('--leave', type=int, default=200, help="dialogs to leave end-to-end (default 200)")
+    parser.add_argument('--latency', type=float, default=0.0, help="fake network latency in seconds")
+    parser.add_argument('--page-latency', type=float, default=0.1,
+                        help="fake latency per page of 100 dialogs in the fetch benchmark (default 0.1s)")
+    parser.add_argument('--changed', type=int, default=20,
+                        help="chats with new messages before the incremental fetch (default 20)")
+    parser.add_argument('--flood-every', type=int, default=0, help="raise FloodWaitError every N requests")
+    parser.add_argument('--flood-seconds', type=int, default=1, help="FloodWaitError.seconds")
+    parser.add_argument('--rate-start', type=float, default=50.0, help="scheduler start rate (req/s)")
+    parser.add_argument('--rate-max', type=float, default=100.0, help="scheduler max rate (req/s)")
+    parser.add_argument('--workers', type=int, default=1, help="parallel leave workers")
+    parser.add_argument('--repeat', type=int, default=50, help="repeats for micro benchmarks")
+    parser.add_argument('--output', default='bench_results.json', help="JSON results file")
+    parser.add_argument('--compare', metavar='OLD_JSON', help="compare with an older results file")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    dialogs = make_dialogs(args.dialogs)
+    results = {}
+
+    # All files (cache, logs, journals) go to a throwaway folder
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results['fetch_dialogs'], app = bench_fetch(args, dialogs)
+                results['leave'] = bench_leave(args, dialogs)
+            results['store'] = bench_store(args, app)
+            results['parse_range'] = bench_parse_range(args, len(app.dialogs))
+            results['search'] = bench_search(args, app)
+            results['filter'] = bench_filter(args, app)
+            results['show_dialogs'] = bench_render(args, app)
+        finally:
+            os.chdir(cwd)
+
+    return results
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': main.numpy() is not None,
+        'params': vars(args),
+        'results': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"\n📄 Saved: {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,45 @@
+"""
+Shared fixtures. main.py imports Telethon lazily, so everything except
+the leave tests (test_leave.py) runs without it.
+"""
+import os
+import sys
+
+import pytest
+
+# main.py lives in the repo root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+NOW = 1_700_000_000.0
+DAY = 86400
+
+
+def make_dialogs():
+    """A small mixed list: (title, kind, type, username, age in days, unread, flags)."""
+    rows = [
+        ('Crypto News', 'channel', 'channel', 'cryptonews', 1, 500, 0),
+        ('Crypto Signals Club', 'channel', 'group', None, 40, 0, main.FLAG_MUTED),
+        ('Family', 'chat', 'group', None, 2, 3, main.FLAG_PINNED),
+        ('Tech News Daily', 'channel', 'channel', 'technews', 100, 9000, main.FLAG_ARCHIVED),
+        ('Python Jobs', 'channel', 'group', 'pyjobs', 200, 0, main.FLAG_ADMIN),
+        ('Café Owners', 'chat', 'group', None, 5, 12, main.FLAG_CREATOR),
+        ('Airdrop Alerts', 'channel', 'channel', None, 95, 0, 0),
+        ('ab cd', 'chat', 'group', None, 30, 0, 0),
+    ]
+    return [main.Dialog(i, 100 + i, 7000 + i if kind == 'channel' else 0, kind, type, title,
+                        username, NOW - age * DAY, unread, flags)
+            for i, (title, kind, type, username, age, unread, flags) in enumerate(rows, 1)]
+
+
+@pytest.fixture
+def store():
+    return main.DialogStore(make_dialogs())
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temp folder: jobs/, logs/ and dialogs.db land there."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,55 @@
+import pytest
+
+import main
+from conftest import DAY, NOW, make_dialogs
+from main import DialogStore, FilterError, compile_filter
+
+
+@pytest.mark.parametrize('expr', [
+    'type:channel and age>2d and not is:admin',
+    'type:group or is:pinned',
+    'is:archived title~news',
+    'not type:group and unread>100',
+    'has:username age<=50d',
+])
+def test_matching_equals_plain_predicate(store, expr):
+    predicate = compile_filter(expr, now=NOW)
+    expected = [d.idx for d in make_dialogs() if predicate(d)]
+    assert [d.idx for d in store.matching(predicate)] == expected
+
+
+def test_columns_only_for_terms_every_match_needs():
+    assert compile_filter('type:channel and age>2d', now=NOW).columns == {
+        'type': 'channel', 'until': NOW - 2 * DAY}
+    assert compile_filter('is:archived and title~x', now=NOW).columns == {
+        'flags': main.FLAG_ARCHIVED}
+    # or / not can't be pushed down
+    assert compile_filter('type:group or is:pinned', now=NOW).columns == {}
+    assert compile_filter('not type:group', now=NOW).columns == {}
+
+
+def test_mask_matches_columns(store):
+    columns = compile_filter('type:channel and age>50d', now=NOW).columns
+    assert [d.title for d in store.where(store.mask(**columns))] == [
+        'Tech News Daily', 'Airdrop Alerts']
+
+
+def test_uses_info():
+    assert compile_filter('members<50').uses_info
+    assert compile_filter('has:linked').uses_info
+    assert not compile_filter('type:group').uses_info
+
+
+@pytest.mark.parametrize('expr', ['', 'type:', 'age>3x', '(type:group', 'title~(', 'bogus:1'])
+def test_bad_filters_raise(expr):
+    with pytest.raises(FilterError):
+        compile_filter(expr)
+
+
+def test_store_keeps_records_by_kind_and_id():
+    store = DialogStore(make_dialogs())
+    # A basic group and a channel can share an id
+    store.append(main.Dialog(0, 101, 5, 'chat', 'group', 'Same Id'))
+    assert store.get('channel', 101).title == 'Crypto News'
+    assert store.get('chat', 101).title == 'Same Id'
+    assert store.by_idx(9).title == 'Same Id'
@@ -0,0 +1,42 @@
+from conftest import make_dialogs
+from main import Journal
+
+
+def test_plan_outcomes_and_resume(workdir):
+    plan = make_dialogs()[:4]
+    journal = Journal.create(plan, session='acc')
+    journal.record(plan[0], True)
+    journal.record(plan[1], False)
+    journal.skip(plan[2])           # Budget ran out: still to do
+    journal.close()
+
+    path = Journal.latest_unfinished('acc')
+    assert path == journal.path
+    loaded, handled, finished = Journal.load(path)
+    assert [(d.kind, d.id, d.title) for d in loaded] == [(d.kind, d.id, d.title) for d in plan]
+    assert handled == {(plan[0].kind, plan[0].id), (plan[1].kind, plan[1].id)}
+    assert not finished
+
+
+def test_finished_job_is_not_offered(workdir):
+    journal = Journal.create(make_dialogs()[:2], session='acc')
+    journal.finish({'success': 2, 'failed': 0})
+    assert Journal.latest_unfinished('acc') is None
+
+
+def test_sessions_dont_share_jobs(workdir):
+    Journal.create(make_dialogs()[:1], session='session').close()
+    assert Journal.latest_unfinished('session_9198') is None
+    assert Journal.latest_unfinished('session') is not None
+
+
+def test_half_written_line_is_ignored(workdir):
+    plan = make_dialogs()[:2]
+    journal = Journal.create(plan, session='acc')
+    journal.record(plan[0], True)
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "done", "ki')        # Crash in the middle of a write
+
+    _, handled, finished = Journal.load(journal.path)
+    assert handled == {(plan[0].kind, plan[0].id)} and not finished
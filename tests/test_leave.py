@@ -0,0 +1,123 @@
+"""_execute_leave end to end against a fake client (needs Telethon for the requests)."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('telethon')
+
+import main  # noqa: E402
+from conftest import make_dialogs  # noqa: E402
+from main import App, Journal, LeaveScheduler  # noqa: E402
+
+
+class RPCError(Exception):
+    """Permanent Telegram error stand-in (e.g. CHANNEL_PRIVATE)."""
+    code = 400
+
+
+class FakeClient:
+    """
+    Answers leave requests after `latency` seconds.
+
+    errors: chat id → list of exceptions to raise, one per request
+    (then it works).
+    """
+
+    def __init__(self, latency=0.0, errors=None):
+        self.latency = latency
+        self.errors = errors or {}
+        self.sent = []
+
+    async def __call__(self, request):
+        chat = getattr(request, 'chat_id', None) or request.channel.channel_id
+        self.sent.append(chat)
+        await asyncio.sleep(self.latency)
+        pending = self.errors.get(chat)
+        if pending:
+            raise pending.pop(0)
+        return True
+
+    async def disconnect(self):
+        pass
+
+
+def run(app, dialogs):
+    asyncio.run(app._execute_leave(dialogs, summary=False))
+    app.cache.close()
+    return app.last_run
+
+
+def make_app(client, budget=None):
+    app = App(0, 'test', '+0', client=client, budget=budget)
+    app.scheduler = LeaveScheduler(rate=100.0, rate_max=100.0)
+    return app
+
+
+def test_leaves_everything_and_closes_job(workdir):
+    client = FakeClient()
+    dialogs = make_dialogs()
+    report = run(make_app(client), dialogs)
+
+    assert report['success'] == len(dialogs) and report['failed'] == 0
+    assert sorted(client.sent) == sorted(d.id for d in dialogs)
+    assert Journal.latest_unfinished() is None
+
+
+def test_transient_error_is_retried(workdir, monkeypatch):
+    monkeypatch.setattr(main, 'RETRY_BASE_DELAY', 0.01)
+    dialogs = make_dialogs()[:3]
+    client = FakeClient(errors={dialogs[1].id: [ConnectionError(), ConnectionError()]})
+    report = run(make_app(client), dialogs)
+
+    assert report['success'] == 3 and report['retried'] == 2 and report['dead'] == 0
+    assert client.sent.count(dialogs[1].id) == 3
+
+
+def test_retries_run_out(workdir, monkeypatch):
+    monkeypatch.setattr(main, 'RETRY_BASE_DELAY', 0.01)
+    dialogs = make_dialogs()[:2]
+    client = FakeClient(errors={dialogs[0].id: [ConnectionError()] * 10})
+    report = run(make_app(client), dialogs)
+
+    assert report['failed'] == 1 and report['retried'] == main.RETRY_ATTEMPTS
+    # Network trouble isn't a dead letter: it may work next time
+    assert report['dead'] == 0
+
+
+def test_permanent_error_is_a_dead_letter(workdir):
+    dialogs = make_dialogs()[:3]
+    client = FakeClient(errors={dialogs[0].id: [RPCError()]})
+    report = run(make_app(client), dialogs)
+
+    assert report['failed'] == 1 and report['retried'] == 0
+    assert [(d.id, error) for d, error in report['dead_letters']] == [(dialogs[0].id, 'RPCError')]
+    assert client.sent.count(dialogs[0].id) == 1
+
+
+def test_budget_skips_what_cant_finish(workdir):
+    dialogs = make_dialogs()
+    app = make_app(FakeClient(latency=0.2), budget=0.7 / 60)
+    start = time.monotonic()
+    report = run(app, dialogs)
+
+    assert time.monotonic() - start < 1.5
+    assert 0 < report['success'] < len(dialogs)
+    assert report['remaining'] == len(dialogs) - report['success']
+
+    # Skipped chats stay in the journal for resume
+    path = Journal.latest_unfinished()
+    plan, handled, finished = Journal.load(path)
+    assert not finished and len(plan) - len(handled) == report['remaining']
+
+
+def test_budget_doesnt_wait_for_late_retries(workdir, monkeypatch):
+    monkeypatch.setattr(main, 'RETRY_BASE_DELAY', 30.0)
+    dialogs = make_dialogs()[:3]
+    client = FakeClient(errors={dialogs[0].id: [ConnectionError()]})
+    start = time.monotonic()
+    report = run(make_app(client, budget=2 / 60), dialogs)
+
+    # The retry would be due long after the budget → skipped, not slept on
+    assert time.monotonic() - start < 1.5
+    assert report['success'] == 2 and report['remaining'] == 1
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+import main
+from main import LeaveScheduler, TokenBucket, backoff, is_transient
+
+
+class RPCError(Exception):
+    """Stand-in for a Telethon RPCError (only .code matters)."""
+    def __init__(self, code):
+        self.code = code
+
+
+@pytest.mark.parametrize('attempt', [1, 2, 3, 10])
+def test_backoff_doubles_with_jitter_up_to_max(attempt):
+    delay = min(main.RETRY_MAX_DELAY, main.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    for _ in range(50):
+        assert delay / 2 <= backoff(attempt) <= delay
+
+
+def test_is_transient():
+    assert is_transient(ConnectionError())
+    assert is_transient(asyncio.TimeoutError())
+    assert is_transient(RPCError(500))
+    assert is_transient(RPCError(-503))
+    assert not is_transient(RPCError(400))
+    assert not is_transient(ValueError())
+
+
+def test_rate_goes_up_to_its_own_ceiling():
+    scheduler = LeaveScheduler(rate=1.0, rate_max=1.1)
+    for _ in range(10):
+        scheduler.success('LeaveChannelRequest')
+    assert scheduler.buckets['LeaveChannelRequest'].rate == pytest.approx(1.1)
+    assert scheduler.buckets['DeleteChatUserRequest'].rate == 1.0
+    assert scheduler.rate_max == 1.1 and main.RATE_MAX != 1.1
+
+
+def test_flood_blocks_and_cuts_rate():
+    scheduler = LeaveScheduler(rate=1.0)
+    scheduler.flood('LeaveChannelRequest', 30)
+    bucket = scheduler.buckets['LeaveChannelRequest']
+    assert bucket.rate == pytest.approx(main.RATE_BACKOFF)
+    assert scheduler.ready_at('LeaveChannelRequest') >= time.monotonic() + 29
+    assert scheduler.flood_waits == 1 and scheduler.flood_seconds == 30
+
+
+def test_simulate_spaces_requests_by_rate():
+    scheduler = LeaveScheduler(rate=2.0, rate_max=2.0)
+    done = scheduler.simulate(['LeaveChannelRequest'] * 3, {'LeaveChannelRequest': 0.1})
+    # First token is ready now, then one every 1/rate seconds
+    assert done == pytest.approx([0.1, 0.6, 1.1], abs=0.02)
+
+
+def test_token_bucket_waits_for_tokens():
+    async def take(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Full bucket → first is instant, the next two wait 1/rate each
+    assert 0.18 <= asyncio.run(take(TokenBucket(rate=10.0), 3)) < 0.5
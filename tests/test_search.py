@@ -0,0 +1,35 @@
+from main import SearchIndex
+
+
+def titles(dialogs):
+    return [d.title for d in dialogs]
+
+
+def test_word_start_ranks_first(store):
+    index = SearchIndex(store)
+    # "News" at a word start in both; ties keep display order
+    assert titles(index.search('news')) == ['Crypto News', 'Tech News Daily']
+
+
+def test_accents_case_and_username(store):
+    index = SearchIndex(store)
+    assert titles(index.search('CAFE')) == ['Café Owners']
+    assert titles(index.search('pyjobs')) == ['Python Jobs']
+
+
+def test_one_typo_only_when_fuzzy(store):
+    index = SearchIndex(store)
+    assert 'Crypto News' in titles(index.search('crypto nwes'))
+    assert index.search('nwes', fuzzy=False) == []
+
+
+def test_within_limits_results(store):
+    index = SearchIndex(store)
+    assert titles(index.search('crypto', within={2})) == ['Crypto Signals Club']
+
+
+def test_short_words_use_substring_scan(store):
+    index = SearchIndex(store)
+    # No word long enough for a trigram → plain substring match
+    assert titles(index.search('b c')) == ['ab cd']
+    assert titles(index.search('cd')) == ['ab cd']
@@ -0,0 +1,36 @@
+from main import Selection, parse_range
+
+
+def test_parse_range_formats():
+    assert list(parse_range('1-3,5,8-9', 10)) == [1, 2, 3, 5, 8, 9]
+    assert list(parse_range(' 2 , 4 ', 10)) == [2, 4]
+    assert len(parse_range('all', 10)) == 10
+    assert not parse_range('', 10)
+    assert not parse_range('none', 10)
+
+
+def test_parse_range_clips_to_list():
+    # Same numbers the old per-index loop picked, without expanding the range
+    assert list(parse_range('0-5', 10)) == [1, 2, 3, 4, 5]
+    assert list(parse_range('8-20', 10)) == [8, 9, 10]
+    assert parse_range('1-1000000', 50) == Selection([(1, 50)])
+
+
+def test_parse_range_skips_bad_parts():
+    assert list(parse_range('5-3,x,7,0,11,1-2-3', 10)) == [7]
+
+
+def test_selection_merges_spans():
+    assert Selection([(4, 9), (1, 5), (10, 12), (20, 19)]).spans == [(1, 12)]
+    assert Selection.of([3, 1, 2, 7, 7]).spans == [(1, 3), (7, 7)]
+
+
+def test_selection_set_operations():
+    a = Selection([(1, 10), (20, 30)])
+    b = Selection([(5, 25)])
+    assert (a | b).spans == [(1, 30)]
+    assert (a & b).spans == [(5, 10), (20, 25)]
+    assert (a - b).spans == [(1, 4), (26, 30)]
+    assert a.complement(35).spans == [(11, 19), (31, 35)]
+    assert len(a) == 21
+    assert 20 in a and 15 not in a and 0 not in a
@@ -0,0 +1,50 @@
+import pytest
+
+import main
+from conftest import make_dialogs
+from main import DialogStore, Snapshot, SnapshotError, diff_snapshots
+
+
+def test_round_trip(tmp_path, store):
+    store.set_info({('channel', 101): 1500}, {('channel', 101): 555})
+    path = str(tmp_path / 'a.snap')
+    Snapshot.write(path, store, label='acc1')
+
+    snap = Snapshot(path)
+    try:
+        loaded = snap.load()
+        assert snap.label == 'acc1' and len(snap) == len(store)
+    finally:
+        snap.close()
+
+    fields = ('idx', 'id', 'access_hash', 'kind', 'type', 'title', 'username',
+              'date', 'unread', 'flags', 'members', 'linked')
+    for a, b in zip(store, loaded):
+        assert [getattr(a, f) for f in fields] == [getattr(b, f) for f in fields]
+    assert loaded.get('channel', 101).members == 1500
+
+
+def test_not_a_snapshot(tmp_path):
+    path = tmp_path / 'x.snap'
+    path.write_bytes(b'hello world, not a snapshot at all')
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
+
+
+def test_diff(tmp_path, capsys):
+    dialogs = make_dialogs()
+    old, new = str(tmp_path / 'old.snap'), str(tmp_path / 'new.snap')
+    Snapshot.write(old, DialogStore(dialogs[:5]))
+    Snapshot.write(new, DialogStore(dialogs[2:] + [main.Dialog(0, 999, 1, 'channel',
+                                                              'channel', 'Brand New')]))
+
+    assert diff_snapshots(old, new) == main.EXIT_OK
+    out = capsys.readouterr().out
+    only_old, only_new = out.split('Only in ' + new)
+    assert 'Crypto News' in only_old and 'Family' not in only_old
+    assert 'Brand New' in only_new and 'Airdrop Alerts' in only_new
+    assert 'In both: 3' in out
+
+
+def test_diff_unreadable(tmp_path):
+    assert diff_snapshots(str(tmp_path / 'missing.snap'), 'x') == main.EXIT_ERROR